@@ -1,12 +1,13 @@
 from flask import Flask, request, jsonify
 from sentence_transformers import SentenceTransformer
-import faiss
 import numpy as np
 import json
 from openai import OpenAI
 import tensorflow as tf
 from PIL import Image, ImageOps
 import os
+from retrieval import GuidelineIndex
+from runtime import configure_threads, create_executors, create_request_slots, plan_threads
 
 app = Flask(__name__)
 
@@ -16,6 +17,12 @@ np.set_printoptions(suppress=True)
 # Configure TensorFlow (CPU usage since no GPU setup is specified)
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"  # Suppress TensorFlow logging
 
+# Share one core budget between TF, PyTorch and FAISS (SERVING_CORES / SERVING_WORKERS / SERVING_THREADS)
+thread_plan = configure_threads(plan_threads())
+executors = create_executors(thread_plan)
+request_slots = create_request_slots(thread_plan)
+print("Thread plan:", thread_plan)
+
 # Load the SavedModel
 try:
     model = tf.saved_model.load("models/content")
@@ -524,15 +531,9 @@ data = [
 ]
 
 
-# Combine context for embeddings
-guidelines = [entry["context"] for entry in data]
+# Chunk and embed the context, input and output of each entry into one FAISS index
 sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-embeddings = sentence_model.encode(guidelines, convert_to_numpy=True)
-
-# Create FAISS index
-dimension = embeddings.shape[1]
-index = faiss.IndexFlatL2(dimension)
-index.add(embeddings)
+guideline_index = GuidelineIndex.build(data, sentence_model)
 
 # Initialize OpenAI client
 try:
@@ -580,29 +581,37 @@ def analyze_image(image_path):
     except Exception as e:
         return f"Error in image analysis: {str(e)}"
 
+# Retrieve the top k guidelines for a query with FAISS
+def retrieve_guidelines(query, k=3):
+    query_embedding = executors["embedding"].run(
+        sentence_model.encode, [query], convert_to_numpy=True, normalize_embeddings=True
+    )
+    D, I = executors["search"].run(guideline_index.search, query_embedding, k=k, aggregate="max")
+    return [guideline_index.guidelines[i] for i in I[0] if i >= 0]
+
 # RAG and report generation with error handling
 def generate_report(image_path=None, nurse_observations="No observations recorded"):
     try:
-        # Step 1: Real image analysis using the SavedModel
-        image_findings = analyze_image(image_path)
-        print(f"Image Findings: {image_findings}")
-
-        # Step 2: Use the provided nurse observations
-        nurse_obs = nurse_observations if nurse_observations else "No observations recorded"
-        print(f"Nurse Observations: {nurse_obs}")
-
-        # Check for mismatch between image findings and nurse observations
-        if "Error" not in image_findings and "No image" not in image_findings:
-            detected_condition = image_findings.split("Detected: ")[1].split(" (Confidence")[0].lower()
-            if "deep cut" in nurse_obs.lower() and "deep cut" not in detected_condition.lower():
-                image_findings += " (Note: Image finding may not align with nurse observation of a deep cut)"
-
-        # Step 3: Retrieve guideline with FAISS
-        query = f"{nurse_obs} {image_findings}" if "Error" not in image_findings else nurse_obs
-        query_embedding = sentence_model.encode([query], convert_to_numpy=True)
-        D, I = index.search(query_embedding, k=3)  # Retrieve top 3 guidelines
-        retrieved_guidelines = [guidelines[i] for i in I[0]]
-        print(f"Retrieved Guidelines: {retrieved_guidelines}")
+        # Steps 1-3 hold a request slot so the thread plan's core budget holds under load
+        with request_slots:
+            # Step 1: Real image analysis using the SavedModel
+            image_findings = analyze_image(image_path)
+            print(f"Image Findings: {image_findings}")
+
+            # Step 2: Use the provided nurse observations
+            nurse_obs = nurse_observations if nurse_observations else "No observations recorded"
+            print(f"Nurse Observations: {nurse_obs}")
+
+            # Check for mismatch between image findings and nurse observations
+            if "Error" not in image_findings and "No image" not in image_findings:
+                detected_condition = image_findings.split("Detected: ")[1].split(" (Confidence")[0].lower()
+                if "deep cut" in nurse_obs.lower() and "deep cut" not in detected_condition.lower():
+                    image_findings += " (Note: Image finding may not align with nurse observation of a deep cut)"
+
+            # Step 3: Retrieve guideline with FAISS
+            query = f"{nurse_obs} {image_findings}" if "Error" not in image_findings else nurse_obs
+            retrieved_guidelines = retrieve_guidelines(query, k=3)  # Retrieve top 3 guidelines
+            print(f"Retrieved Guidelines: {retrieved_guidelines}")
 
         # Step 4: Generate report with OpenAI
         if client is None:
@@ -675,4 +684,4 @@ def health():
     return jsonify({"status": "healthy"})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
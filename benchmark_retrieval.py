@@ -0,0 +1,97 @@
+import time
+
+import numpy as np
+
+from app import data, sentence_model
+from retrieval import FIELDS, GuidelineIndex
+
+# Labeled eval set built from `data`: each entry's input is turned into the query that
+# generate_report would send (nurse observation + image findings), labeled with its own guideline.
+def build_eval_set(data):
+    queries, labels = [], []
+    for guideline_id, entry in enumerate(data):
+        nurse_obs, _, image_findings = entry["input"].partition(", Image Analysis: ")
+        nurse_obs = nurse_obs.replace("Nurse Observation: ", "", 1)
+        queries.append(f"{nurse_obs} {image_findings}".strip())
+        labels.append(guideline_id)
+    return queries, np.asarray(labels)
+
+
+# Leave-one-out: drop the input/output chunks of the entry the query was built from,
+# otherwise the multi-field index would just look up its own query text.
+def leave_one_out(guideline_index, labels):
+    context_field = guideline_index.fields.index("context")
+
+    def exclude(row, chunk_ids):
+        return (guideline_index.chunk_guideline[chunk_ids] == labels[row]) & (
+            guideline_index.chunk_field[chunk_ids] != context_field
+        )
+
+    return exclude
+
+
+# The serving chunk_k, over-fetched by the most chunks leave-one-out can drop for one query,
+# so the eval aggregates over as many surviving chunks as a serving search would
+def eval_chunk_k(guideline_index, k=3):
+    context_field = guideline_index.fields.index("context")
+    excluded = np.bincount(
+        guideline_index.chunk_guideline[guideline_index.chunk_field != context_field],
+        minlength=len(guideline_index.guidelines),
+    )
+    return min(guideline_index.index.ntotal, guideline_index.default_chunk_k(k) + int(excluded.max()))
+
+
+def evaluate(guideline_index, query_embeddings, labels, aggregate, chunk_k, k=3):
+    _, I = guideline_index.search(
+        query_embeddings,
+        k=k,
+        aggregate=aggregate,
+        chunk_k=chunk_k,
+        exclude=leave_one_out(guideline_index, labels),
+    )
+    hits = I == labels[:, None]
+    ranks = np.where(hits.any(axis=1), hits.argmax(axis=1) + 1, np.inf)
+    return {
+        "recall@1": float(hits[:, 0].mean()),
+        f"recall@{k}": float(hits.any(axis=1).mean()),
+        f"mrr@{k}": float(np.mean(1.0 / ranks)),
+    }
+
+
+# Per-query latency for one query at k=3, with the same chunk_k as the quality eval
+def measure_latency(guideline_index, query_embeddings, aggregate, chunk_k, repeats=5):
+    timings = []
+    for _ in range(repeats):
+        for query_embedding in query_embeddings:
+            start = time.perf_counter()
+            guideline_index.search(query_embedding[None, :], k=3, aggregate=aggregate, chunk_k=chunk_k)
+            timings.append(time.perf_counter() - start)
+    timings = np.asarray(timings) * 1000
+    return float(np.median(timings)), float(np.percentile(timings, 95))
+
+
+if __name__ == '__main__':
+    queries, labels = build_eval_set(data)
+    query_embeddings = sentence_model.encode(queries, convert_to_numpy=True, normalize_embeddings=True)
+
+    configs = [
+        ("context only (baseline)", GuidelineIndex.build(data, sentence_model, fields=("context",)), "max"),
+    ]
+    multi_index = GuidelineIndex.build(data, sentence_model, fields=FIELDS)
+    configs.append(("context+input+output, max", multi_index, "max"))
+    # "sum" and "mean" are left out: leave-one-out removes chunks from the correct guideline
+    # only, so any score that depends on how many chunks a guideline has is biased for or
+    # against the label by construction. "max" scores each guideline by its best chunk alone.
+
+    print(f"Eval set: {len(queries)} queries over {len(data)} guidelines (leave-one-out)")
+    header = f"{'config':<28}{'vectors':>8}{'chunk_k':>8}{'size KiB':>10}{'p50 ms':>9}{'p95 ms':>9}{'R@1':>7}{'R@3':>7}{'MRR@3':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, guideline_index, aggregate in configs:
+        chunk_k = eval_chunk_k(guideline_index)
+        metrics = evaluate(guideline_index, query_embeddings, labels, aggregate, chunk_k)
+        p50, p95 = measure_latency(guideline_index, query_embeddings, aggregate, chunk_k)
+        print(
+            f"{name:<28}{guideline_index.index.ntotal:>8}{chunk_k:>8}{guideline_index.nbytes() / 1024:>10.1f}"
+            f"{p50:>9.3f}{p95:>9.3f}{metrics['recall@1']:>7.3f}{metrics['recall@3']:>7.3f}{metrics['mrr@3']:>8.3f}"
+        )
@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+
+def powers_of_two(limit):
+    values, value = [], 1
+    while value <= limit:
+        values.append(value)
+        value *= 2
+    return values
+
+
+# Runs inside a fresh process: TF thread pools can only be configured once, so every
+# workers x threads configuration gets its own interpreter.
+def run_config(cores, workers, threads, requests, concurrency):
+    os.environ["SERVING_CORES"] = str(cores)
+    os.environ["SERVING_WORKERS"] = str(workers)
+    os.environ["SERVING_THREADS"] = str(threads)
+    import app
+
+    rng = np.random.default_rng(0)
+    image_path = os.path.join(tempfile.mkdtemp(), "bench.jpg")
+    Image.fromarray(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)).save(image_path)
+    observations = [
+        entry["input"].partition(", Image Analysis: ")[0].replace("Nurse Observation: ", "", 1)
+        for entry in app.data
+    ]
+
+    # Image analysis and guideline retrieval as in generate_report, without the OpenAI call.
+    # An error from the image model must fail the run, not be timed as a fast request.
+    def handle(i):
+        start = time.perf_counter()
+        with app.request_slots:
+            image_findings = app.analyze_image(image_path)
+            if image_findings.startswith("Error"):
+                raise RuntimeError(image_findings)
+            app.retrieve_guidelines(f"{observations[i % len(observations)]} {image_findings}")
+        return time.perf_counter() - start
+
+    for i in range(concurrency):
+        handle(i)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        start = time.perf_counter()
+        latencies = list(clients.map(handle, range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = np.asarray(latencies) * 1000
+    return {
+        "workers": workers,
+        "threads": threads,
+        "plan": app.thread_plan,
+        "throughput": requests / elapsed,
+        "p50_ms": float(np.median(latencies)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def sweep(cores, requests, concurrency):
+    results = []
+    for workers in powers_of_two(cores):
+        # threads is the per-call TF/torch intra-op count; allow up to 2x oversubscription
+        # of workers * threads so its cost shows up in the table
+        for threads in powers_of_two(cores):
+            if workers * threads > 2 * cores:
+                continue
+            command = [
+                sys.executable, __file__, "--child",
+                "--cores", str(cores),
+                "--workers", str(workers),
+                "--threads", str(threads),
+                "--requests", str(requests),
+                "--concurrency", str(concurrency),
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                sys.exit(f"workers={workers} threads={threads} failed:\n{completed.stderr.strip()}")
+            output = completed.stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            results.append(result)
+            plan = result["plan"]
+            print(
+                f"{result['workers']:>8}{result['threads']:>9}"
+                f"{plan['tf_intra_op']:>7}{plan['torch']:>7}{plan['faiss']:>7}{result['throughput']:>12.2f}"
+                f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}",
+                flush=True,
+            )
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sweep worker x thread configurations of the serving runtime")
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1, help="core budget to share")
+    parser.add_argument("--requests", type=int, default=200, help="requests per configuration")
+    parser.add_argument("--concurrency", type=int, default=0, help="client threads, fixed for the whole sweep (default: cores)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.concurrency = args.concurrency or args.cores
+
+    if args.child:
+        result = run_config(args.cores, args.workers, args.threads, args.requests, args.concurrency)
+        print(json.dumps(result))
+        sys.exit(0)
+
+    print(f"Core budget: {args.cores}, {args.requests} requests per configuration, {args.concurrency} clients")
+    print(f"{'workers':>8}{'threads':>9}{'tf':>7}{'torch':>7}{'faiss':>7}{'req/s':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    results = sweep(args.cores, args.requests, args.concurrency)
+
+    best_throughput = max(results, key=lambda r: r["throughput"])
+    best_latency = min(results, key=lambda r: r["p95_ms"])
+    # Trade-off: highest throughput whose p95 stays within 1.5x of the best p95
+    trade_off = max(
+        (r for r in results if r["p95_ms"] <= 1.5 * best_latency["p95_ms"]),
+        key=lambda r: r["throughput"],
+    )
+    for label, r in (("Best throughput", best_throughput), ("Best p95 latency", best_latency), ("Best trade-off", trade_off)):
+        print(
+            f"{label}: SERVING_WORKERS={r['workers']} SERVING_THREADS={r['threads']} "
+            f"({r['throughput']:.2f} req/s, p95 {r['p95_ms']:.1f} ms)"
+        )
@@ -0,0 +1,117 @@
+import re
+
+import faiss
+import numpy as np
+
+# Fields of each data entry that get embedded. The context is the guideline itself,
+# input/output carry the nurse phrasing and report wording seen for that guideline.
+FIELDS = ("context", "input", "output")
+
+# Template lines repeated in every report; embedding them only adds noise
+BOILERPLATE_LINES = re.compile(r"^(Patient Report|Doctor Prompts|- Date:.*)$")
+
+
+# Split a field into overlapping word windows so long protocols are not blurred into one vector
+def chunk_text(text, max_words=48, overlap=16):
+    lines = [line.strip() for line in text.split("\n")]
+    words = " ".join(line for line in lines if line and not BOILERPLATE_LINES.match(line)).split()
+    if not words:
+        return []
+    if len(words) <= max_words:
+        return [" ".join(words)]
+
+    step = max_words - overlap
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + max_words]))
+        if start + max_words >= len(words):
+            break
+    return chunks
+
+
+# FAISS index over chunks of several fields, scored per guideline.
+# Every row of the FAISS index is one chunk; chunk_guideline and chunk_field map the row
+# back to the data entry and the field it came from. Embeddings are L2-normalized so the
+# inner product is the cosine similarity and per-guideline scores can be summed.
+class GuidelineIndex:
+    def __init__(self, index, chunk_guideline, chunk_field, guidelines, fields):
+        self.index = index
+        self.chunk_guideline = chunk_guideline
+        self.chunk_field = chunk_field
+        self.guidelines = guidelines
+        self.fields = fields
+        self.chunks_per_guideline = np.bincount(chunk_guideline, minlength=len(guidelines))
+
+    @classmethod
+    def build(cls, data, sentence_model, fields=FIELDS, max_words=48, overlap=16):
+        chunks, chunk_guideline, chunk_field = [], [], []
+        for guideline_id, entry in enumerate(data):
+            for field_id, field in enumerate(fields):
+                for chunk in chunk_text(entry.get(field, ""), max_words, overlap):
+                    chunks.append(chunk)
+                    chunk_guideline.append(guideline_id)
+                    chunk_field.append(field_id)
+
+        embeddings = sentence_model.encode(chunks, convert_to_numpy=True, normalize_embeddings=True)
+        index = faiss.IndexFlatIP(embeddings.shape[1])
+        index.add(embeddings.astype(np.float32))
+
+        return cls(
+            index,
+            np.asarray(chunk_guideline, dtype=np.int32),
+            np.asarray(chunk_field, dtype=np.uint8),
+            [entry["context"] for entry in data],
+            tuple(fields),
+        )
+
+    def nbytes(self):
+        # Flat index stores raw float32 vectors, plus the two chunk mapping arrays
+        return self.index.ntotal * self.index.d * 4 + self.chunk_guideline.nbytes + self.chunk_field.nbytes
+
+    # Number of chunks fetched from FAISS before aggregating into k guidelines
+    def default_chunk_k(self, k):
+        return min(self.index.ntotal, max(k * 8, 32))
+
+    # Returns (scores, guideline_ids) of shape (n_queries, k), like faiss.Index.search.
+    # aggregate is one of:
+    # - "max": best retrieved chunk per guideline.
+    # - "sum": total over the retrieved chunks. Biased towards guidelines with more chunks
+    #   (e.g. a long output split in two), whatever their relevance.
+    # - "mean": the sum divided by the guideline's chunk count, so chunks that were not
+    #   retrieved count as 0 and chunk count no longer inflates the score.
+    # exclude is an optional callback (query_row, chunk_ids) -> bool mask of chunks to drop,
+    # used by the benchmark for leave-one-out evaluation. It does not change the "mean" chunk
+    # counts, which are fixed per guideline when the index is built.
+    def search(self, query_embeddings, k=3, aggregate="max", chunk_k=None, exclude=None):
+        if aggregate not in ("max", "sum", "mean"):
+            raise ValueError(f"Unknown aggregate: {aggregate}")
+
+        n_guidelines = len(self.guidelines)
+        if chunk_k is None:
+            chunk_k = self.default_chunk_k(k)
+        D, I = self.index.search(np.asarray(query_embeddings, dtype=np.float32), chunk_k)
+
+        scores = np.full((len(I), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(I), k), -1, dtype=np.int64)
+        for row in range(len(I)):
+            keep = I[row] >= 0
+            if exclude is not None:
+                keep &= ~exclude(row, I[row])
+            chunk_ids, chunk_scores = I[row][keep], D[row][keep]
+            guideline_ids = self.chunk_guideline[chunk_ids]
+
+            if aggregate == "max":
+                totals = np.full(n_guidelines, -np.inf, dtype=np.float32)
+                np.maximum.at(totals, guideline_ids, chunk_scores)
+            else:
+                totals = np.zeros(n_guidelines, dtype=np.float32)
+                np.add.at(totals, guideline_ids, chunk_scores)
+                totals[np.bincount(guideline_ids, minlength=n_guidelines) == 0] = -np.inf
+                if aggregate == "mean":
+                    totals /= np.maximum(self.chunks_per_guideline, 1)
+
+            top = np.argsort(-totals)[:k]
+            top = top[np.isfinite(totals[top])]
+            scores[row, :len(top)] = totals[top]
+            ids[row, :len(top)] = top
+        return scores, ids
@@ -0,0 +1,106 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import tensorflow as tf
+import torch
+
+
+def _env_int(name):
+    # Unset and empty both mean "use the default"
+    value = os.environ.get(name, "").strip()
+    return int(value) if value else 0
+
+
+# Split one core budget between the TF and PyTorch thread pools.
+# At most `workers` requests are in flight (see create_request_slots), each in one stage at a
+# time: image -> embedding -> search. `threads` is the intra-op thread count one call of a
+# heavy stage gets, and the budget is workers * threads <= cores:
+# - The encoder is serialized, so only one encode runs at a time with `threads` threads.
+# - TF has one intra-op pool shared by all concurrent image calls. While an encode runs, at
+#   most workers - 1 requests are in image analysis, so the pool gets (workers - 1) * threads
+#   and TF plus the encoder never exceed the budget. With one worker the stages never overlap
+#   and TF gets `threads` on its own. One inter-op thread per worker schedules concurrent calls.
+# - FAISS is pinned to 1 thread and left out of the budget: serving searches one query at a
+#   time over a few hundred vectors, and FAISS caps its OpenMP team at the number of queries.
+def plan_threads(core_budget=None, workers=None, threads=None):
+    cores = core_budget or _env_int("SERVING_CORES") or os.cpu_count() or 1
+    workers = workers or _env_int("SERVING_WORKERS") or max(1, min(2, cores // 2))
+    threads = threads or _env_int("SERVING_THREADS") or max(1, cores // workers)
+    return {
+        "cores": cores,
+        "workers": workers,
+        "threads": threads,
+        "tf_intra_op": max(1, workers - 1) * threads,
+        "tf_inter_op": workers,
+        "torch": threads,
+        "faiss": 1,
+    }
+
+
+# Apply the plan process-wide. Must run before the SavedModel is loaded: TF refuses to change
+# its thread pools once the runtime is initialized.
+def configure_threads(plan):
+    tf.config.threading.set_intra_op_parallelism_threads(plan["tf_intra_op"])
+    tf.config.threading.set_inter_op_parallelism_threads(plan["tf_inter_op"])
+    torch.set_num_threads(plan["torch"])
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Already set, or inter-op work has started; keep whatever is there
+        pass
+    faiss.omp_set_num_threads(plan["faiss"])
+    return plan
+
+
+# Dedicated worker pool for one model. Calls from Flask's request threads are queued here, so
+# the number of concurrent calls into the model never exceeds `workers`. Models that are not
+# safe to call concurrently get serialize=True and run on a single worker.
+class ModelExecutor:
+    def __init__(self, name, workers=1, serialize=False, initializer=None):
+        self.name = name
+        self.workers = 1 if serialize else workers
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix=name,
+            initializer=initializer,
+        )
+
+    def submit(self, fn, *args, **kwargs):
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def run(self, fn, *args, **kwargs):
+        return self.submit(fn, *args, **kwargs).result()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+# Caps the requests in the image -> embedding -> search path. Flask's threaded server accepts
+# any number of requests; without this cap the thread budget in plan_threads does not hold.
+def create_request_slots(plan):
+    return threading.BoundedSemaphore(plan["workers"])
+
+
+# Executors for the models that need more than the request slots.
+# TF image calls need nothing extra: TF concrete functions are safe to call from several
+# threads, and request slots already cap them at `workers`, so they run on the request thread.
+# - embedding: the HF fast tokenizer inside SentenceTransformer raises "Already borrowed" when
+#   used from several threads at once, so encode calls are serialized.
+# - search: the OpenMP thread count is per calling thread, so the workers set it on start;
+#   Flask's request threads would otherwise use the OpenMP default of one thread per core.
+def create_executors(plan):
+    workers = plan["workers"]
+    return {
+        "embedding": ModelExecutor(
+            "embedding",
+            serialize=True,
+            initializer=lambda: torch.set_num_threads(plan["torch"]),
+        ),
+        "search": ModelExecutor(
+            "search",
+            workers=workers,
+            initializer=lambda: faiss.omp_set_num_threads(plan["faiss"]),
+        ),
+    }